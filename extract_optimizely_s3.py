@@ -2,10 +2,29 @@
 import os
 import sys
 import re
-import math
 import argparse
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+from s3_download import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_CHUNKSIZE_MB,
+    DEFAULT_WORKERS,
+    LIST_PAGE_SIZE,
+    S3_RETRIES,
+    download_objects,
+    human_size,
+    makedirs_once,
+    positive_int,
+    read_ahead,
+    start_progress_log,
+)
 
 # 1) Load environment variables from .env (local dev)
 try:
@@ -45,14 +64,25 @@ def load_credentials() -> Dict[str, Optional[str]]:
     return creds
 
 
-def s3_client(creds: Dict[str, Optional[str]]):
-    import boto3
-    kwargs = {"region_name": creds.get("AWS_REGION") or "eu-west-1"}
-    if creds.get("AWS_ACCESS_KEY_ID") and creds.get("AWS_SECRET_ACCESS_KEY"):
-        kwargs["aws_access_key_id"] = creds["AWS_ACCESS_KEY_ID"]
-        kwargs["aws_secret_access_key"] = creds["AWS_SECRET_ACCESS_KEY"]
-    # else: let boto3 resolve credentials from the environment/SSO/role
-    return boto3.client("s3", **kwargs)
+def s3_client(creds: Dict[str, Optional[str]], max_pool_connections: int = DEFAULT_WORKERS):
+    # Clients are thread-safe and costly to build; reuse one per credential set.
+    key_id, secret = creds.get("AWS_ACCESS_KEY_ID"), creds.get("AWS_SECRET_ACCESS_KEY")
+    if not (key_id and secret):
+        key_id = secret = None  # let boto3 resolve credentials from the environment/SSO/role
+    return _cached_s3_client(creds.get("AWS_REGION") or "eu-west-1", key_id, secret, max_pool_connections)
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_s3_client(region: str, key_id: Optional[str], secret: Optional[str], max_pool_connections: int):
+    config = Config(
+        signature_version="s3v4",
+        max_pool_connections=max_pool_connections,
+        retries=dict(S3_RETRIES),  # botocore rewrites this dict in place
+        tcp_keepalive=True,
+    )
+    return boto3.client(
+        "s3", region_name=region, aws_access_key_id=key_id, aws_secret_access_key=secret, config=config
+    )
 
 
 def daterange(start: date, end: date) -> Iterable[date]:
@@ -70,101 +100,135 @@ def ymd_path_for(prefix: str, d: date) -> str:
 
 DATE_IN_KEY_REGEX = re.compile(r'(?<!\d)(20\d{2})[-/_]?([01]\d)[-/_]?([0-3]\d)(?!\d)')
 
+
+def _packed_ymd(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def date_key_filter(start: date, end: date) -> Callable[[str], bool]:
+    """
+    Build a predicate equivalent to key_has_date_in_range with the range bounds
+    precomputed. Matches are compared as packed YYYYMMDD ints, so the common
+    case (out of range, or a day <= 28) never constructs a date or raises.
+    """
+    lo, hi = _packed_ymd(start), _packed_ymd(end)
+    finditer = DATE_IN_KEY_REGEX.finditer
+
+    def in_range(key: str) -> bool:
+        for m in finditer(key):
+            y, mth, d = m.groups()
+            ymd = int(y + mth + d)
+            if not lo <= ymd <= hi:
+                continue
+            mth, d = int(mth), int(d)
+            if 1 <= mth <= 12 and 1 <= d <= 28:
+                return True
+            # Day 29-31 (or a bogus month/day): let the calendar decide.
+            try:
+                date(int(y), mth, d)
+                return True
+            except ValueError:
+                continue
+        return False
+
+    return in_range
+
+
 def key_has_date_in_range(key: str, start: date, end: date) -> bool:
     """
     Fallback filter: look for YYYY[-_/]MM[-_/]DD anywhere in the key/filename.
     If multiple matches exist, we accept if ANY falls in range.
+    For per-object scans, build the predicate once with date_key_filter().
+    """
+    return date_key_filter(start, end)(key)
+
+
+def list_s3_objects(client, bucket: str, prefix: str, first_page: Optional[Dict] = None) -> Iterable[Dict]:
+    """Generator yielding objects under bucket/prefix (handles pagination).
+
+    `first_page` is a ListObjectsV2 response already fetched for this prefix;
+    its keys are reused and listing resumes from its continuation token.
+    """
+    if first_page is not None:
+        page = first_page
+        while True:
+            yield from page.get("Contents", [])
+            if not page.get("IsTruncated"):
+                return
+            page = client.list_objects_v2(
+                Bucket=bucket,
+                Prefix=prefix,
+                FetchOwner=False,
+                MaxKeys=LIST_PAGE_SIZE,
+                ContinuationToken=page["NextContinuationToken"],
+            )
+    paginator = client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(
+        Bucket=bucket,
+        Prefix=prefix,
+        FetchOwner=False,
+        PaginationConfig={"PageSize": LIST_PAGE_SIZE},
+    )
+    for page in pages:
+        yield from page.get("Contents", [])
+
+
+def list_by_day_if_partitioned(
+    client,
+    bucket: str,
+    base_prefix: str,
+    start: date,
+    end: date,
+    workers: int = DEFAULT_WORKERS,
+    first_page: Optional[Dict] = None,
+) -> Iterable[Dict]:
+    """List date-partitioned subfolders (prefix/YYYY/MM/DD/) concurrently, yielding in date order.
+
+    At most `workers` days are listed ahead of the consumer, so memory stays
+    bounded by a few days of keys rather than the whole range. `first_page`
+    is the start day's probe response from try_detect_partitioning().
+    """
+    def list_day(d: date) -> List[Dict]:
+        seed = first_page if d == start else None
+        return list(list_s3_objects(client, bucket, ymd_path_for(base_prefix, d), seed))
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        window = deque()
+        for d in daterange(start, end):
+            window.append(ex.submit(list_day, d))
+            if len(window) >= workers:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+
+
+def try_detect_partitioning(client, bucket: str, base_prefix: str, sample_date: date) -> Optional[Dict]:
+    """Heuristic: if we can find objects under prefix/YYYY/MM/DD/, assume date partitioning.
+
+    Returns the probe's ListObjectsV2 response when it found keys, else None.
+    The probe asks for a full page, so the caller can use it as that day's
+    first listing page instead of fetching it again.
     """
-    for m in DATE_IN_KEY_REGEX.finditer(key):
-        try:
-            y, mth, d = int(m.group(1)), int(m.group(2)), int(m.group(3))
-            found = date(y, mth, d)
-            if start <= found <= end:
-                return True
-        except ValueError:
-            continue
-    return False
-
-
-def list_s3_objects(client, bucket: str, prefix: str) -> Iterable[Dict]:
-    """Generator yielding objects under bucket/prefix (handles pagination)."""
-    token = None
-    while True:
-        kwargs = {"Bucket": bucket, "Prefix": prefix}
-        if token:
-            kwargs["ContinuationToken"] = token
-        resp = client.list_objects_v2(**kwargs)
-        for obj in resp.get("Contents", []):
-            yield obj
-        if resp.get("IsTruncated"):
-            token = resp.get("NextContinuationToken")
-        else:
-            break
-
-
-def list_by_day_if_partitioned(client, bucket: str, base_prefix: str, start: date, end: date) -> Iterable[Dict]:
-    """List objects by iterating date-partitioned subfolders (prefix/YYYY/MM/DD/)."""
-    for d in daterange(start, end):
-        day_prefix = ymd_path_for(base_prefix, d)
-        for obj in list_s3_objects(client, bucket, day_prefix):
-            yield obj
-
-
-def try_detect_partitioning(client, bucket: str, base_prefix: str, sample_date: date) -> bool:
-    """Heuristic: if we can find objects under prefix/YYYY/MM/DD/, assume date partitioning."""
     day_prefix = ymd_path_for(base_prefix, sample_date)
-    resp = client.list_objects_v2(Bucket=bucket, Prefix=day_prefix, MaxKeys=1)
-    return "Contents" in resp and len(resp["Contents"]) > 0
+    resp = client.list_objects_v2(Bucket=bucket, Prefix=day_prefix, FetchOwner=False, MaxKeys=LIST_PAGE_SIZE)
+    return resp if resp.get("Contents") else None
 
 
 def ensure_local_path(root_dir: str, key: str) -> str:
     """Map S3 key to local path under root_dir, creating parent directories."""
     # Normalize Windows-safe path
     local_path = os.path.join(root_dir, *key.split("/"))
-    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    makedirs_once(os.path.dirname(local_path))
     return local_path
 
 
-def human_size(n: int) -> str:
-    if n is None:
-        return "0B"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    if n == 0:
-        return "0B"
-    i = int(math.floor(math.log(n, 1024)))
-    return f"{n / (1024 ** i):.2f}{units[i]}"
-
-
-def download_objects(
-    client,
-    bucket: str,
-    objects: List[Dict],
-    out_dir: str,
-    dry_run: bool = False
-) -> Tuple[int, int, int]:
-    ok = skipped = failed = 0
-    total = len(objects)
-    for idx, obj in enumerate(objects, 1):
-        key = obj["Key"]
+def counted(objects: Iterable[Dict], totals: Dict[str, int]) -> Iterable[Tuple[str, int, Optional[str]]]:
+    """Yield (key, size, etag) per listed object, tallying files and bytes into `totals`."""
+    for obj in objects:
         size = obj.get("Size", 0)
-        local_path = ensure_local_path(out_dir, key)
-        # Skip if exists and sizes match
-        if os.path.exists(local_path) and os.path.getsize(local_path) == size:
-            skipped += 1
-            print(f"[{idx}/{total}] SKIP  {key}  ({human_size(size)})")
-            continue
-
-        print(f"[{idx}/{total}] GET   {key}  -> {local_path} ({human_size(size)})")
-        if dry_run:
-            ok += 1
-            continue
-        try:
-            client.download_file(bucket, key, local_path)
-            ok += 1
-        except Exception as e:
-            failed += 1
-            print(f"[ERROR] Failed to download {key}: {e}", file=sys.stderr)
-    return ok, skipped, failed
+        totals["files"] += 1
+        totals["bytes"] += size
+        yield obj["Key"], size, obj.get("ETag")
 
 
 def parse_args():
@@ -177,6 +241,18 @@ def parse_args():
     p.add_argument("--dry-run", action="store_true", help="List and count only; no downloads")
     p.add_argument("--force-scan", action="store_true",
                    help="Force full scan (do not assume date-partitioned subfolders)")
+    p.add_argument("--workers", type=positive_int, default=DEFAULT_WORKERS,
+                   help=f"Concurrent downloads (default: {DEFAULT_WORKERS})")
+    p.add_argument("--multipart-chunksize", type=positive_int, default=DEFAULT_MULTIPART_CHUNKSIZE_MB,
+                   help=f"Byte-range part size in MB for large objects (default: {DEFAULT_MULTIPART_CHUNKSIZE_MB})")
+    p.add_argument("--max-concurrency", type=positive_int, default=DEFAULT_MAX_CONCURRENCY,
+                   help=f"Max in-flight GET requests across all downloads (default: {DEFAULT_MAX_CONCURRENCY})")
+    p.add_argument("--verify", action="store_true",
+                   help="Checksum same-size local files against S3 (ETag/CRC32C) before skipping them")
+    p.add_argument("--force", action="store_true",
+                   help="Re-download every object without checking for existing local files")
+    p.add_argument("--log-every", type=positive_int, default=1,
+                   help="Log SKIP/GET progress for every Nth object only (default: 1, every object)")
     return p.parse_args()
 
 
@@ -189,7 +265,10 @@ def main():
         raise ValueError("end-date cannot be earlier than start-date")
 
     creds = load_credentials()
-    s3 = s3_client(creds)
+    # One client serves up to --workers day listings, --workers small-object
+    # GETs and --max-concurrency ranged GETs (the TransferManager's pool is
+    # shared, so not workers x max-concurrency) at the same time.
+    s3 = s3_client(creds, max_pool_connections=2 * args.workers + args.max_concurrency)
 
     bucket = args.bucket
     prefix = args.prefix if args.prefix else ""
@@ -205,46 +284,53 @@ def main():
     print(f"  Dates:    {start} → {end}")
     print(f"  Out dir:  {os.path.abspath(args.out_dir)}")
     print(f"  Dry run:  {args.dry_run}")
+    print(f"  Workers:  {args.workers}")
     print()
 
     # Strategy: if keys are in prefix/YYYY/MM/DD/, iterate per day (fast).
-    use_partitioned = False
+    first_page = None
     if not args.force_scan:
         try:
-            use_partitioned = try_detect_partitioning(s3, bucket, prefix, start)
+            first_page = try_detect_partitioning(s3, bucket, prefix, start)
         except Exception as e:
             print(f"[WARN] Partition detection failed, will scan: {e}", file=sys.stderr)
 
-    objects: List[Dict] = []
-    if use_partitioned:
+    if first_page is not None:
         print("[INFO] Detected date-partitioned layout (prefix/YYYY/MM/DD/). Listing per-day...")
-        for obj in list_by_day_if_partitioned(s3, bucket, prefix, start, end):
-            objects.append(obj)
+        objects = list_by_day_if_partitioned(
+            s3, bucket, prefix, start, end, workers=args.workers, first_page=first_page
+        )
     else:
         print("[INFO] Scanning under base prefix and filtering keys by date heuristic...")
-        for obj in list_s3_objects(s3, bucket, prefix):
-            if key_has_date_in_range(obj["Key"], start, end):
-                objects.append(obj)
+        in_range = date_key_filter(start, end)
+        objects = (o for o in read_ahead(list_s3_objects(s3, bucket, prefix)) if in_range(o["Key"]))
+
+    # Objects stream from the listing straight into the download workers.
+    totals = {"files": 0, "bytes": 0}
+    listener = start_progress_log()
+    try:
+        ok, skipped, failed = download_objects(
+            client=s3,
+            bucket=bucket,
+            objects=counted(objects, totals),
+            local_path_for=lambda key: ensure_local_path(args.out_dir, key),
+            dry_run=args.dry_run,
+            workers=args.workers,
+            multipart_chunksize=args.multipart_chunksize * 1024 * 1024,
+            max_concurrency=args.max_concurrency,
+            verify=args.verify,
+            force=args.force,
+            log_every=args.log_every,
+        )
+    finally:
+        listener.stop()
 
-    if not objects:
+    if not totals["files"]:
         print("[WARN] No objects found for the given date range and prefix.")
         sys.exit(0)
 
-    # Sort by key for stable ordering
-    objects.sort(key=lambda o: o["Key"])
-
-    total_bytes = sum(o.get("Size", 0) for o in objects)
-    print(f"[INFO] Objects to process: {len(objects)} (~{human_size(total_bytes)})\n")
-
-    ok, skipped, failed = download_objects(
-        client=s3,
-        bucket=bucket,
-        objects=objects,
-        out_dir=args.out_dir,
-        dry_run=args.dry_run
-    )
-
     print("\nSummary:")
+    print(f"  Listed:     {totals['files']} (~{human_size(totals['bytes'])})")
     print(f"  Downloaded: {ok}")
     print(f"  Skipped:    {skipped}")
     print(f"  Failed:     {failed}")
@@ -1,8 +1,12 @@
 from __future__ import annotations
 import os
 import sys
-import math
 import argparse
+import functools
+import threading
+from collections import deque, namedtuple
+from itertools import groupby, zip_longest
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
 from typing import Dict, Iterable, List, Optional, Tuple
@@ -16,9 +20,31 @@ except Exception:
 
 import json
 import re
+import hashlib
+import time
 import urllib.parse
 
-import requests  # type: ignore
+import boto3  # type: ignore
+import urllib3  # type: ignore
+from botocore.config import Config  # type: ignore
+from botocore.credentials import RefreshableCredentials  # type: ignore
+from botocore.session import get_session  # type: ignore
+
+from s3_download import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_CHUNKSIZE_MB,
+    DEFAULT_WORKERS,
+    LIST_PAGE_SIZE,
+    S3_RETRIES,
+    dir_sizes,
+    download_objects,
+    human_size,
+    log,
+    makedirs_once,
+    positive_int,
+    read_ahead,
+    start_progress_log,
+)
 
 # -----------------------------
 # Defaults
@@ -28,11 +54,36 @@ DEFAULT_END_DATE = date(2025, 10, 29)
 DEFAULT_REGION = os.getenv("AWS_REGION", "us-east-1")
 DEFAULT_DURATION = os.getenv("OPTIMIZELY_EXPORT_CRED_DURATION", "1h")  # 15m..1h
 DEFAULT_BUCKET = os.getenv("S3_BUCKET", "optimizely-events-data")
+SPLIT_LIST_WORKERS = 4  # concurrent sub-prefix listings per day once a day spans several pages
+DEFAULT_INTERLEAVE_DAYS = 8  # days whose downloads are mixed so GETs span several date= prefixes
+DEFAULT_LIST_CACHE_TTL_MIN = 60  # reuse cached per-day listings this long before revalidating
+PARTITION_SUFFIXES = ("type=decisions/", "type=events/", "type=decisions-rerun/")  # accepted --prefix endings
+ACCOUNT_BASE_EXACT_REGEX = re.compile(r"v1/account_id=\d+/?$")  # s3Path that stops at the account folder
+ACCOUNT_BASE_REGEX = re.compile(r"(v1/account_id=\d+/)")  # account folder inside a longer s3Path
 
 # -----------------------------
 # Optimizely Auth API
 # -----------------------------
 OPTLY_CRED_URL = "https://api.optimizely.com/v2/export/credentials"
+CRED_EXPIRY_MARGIN_S = 10 * 60  # report expiry this much early so refreshes land before real expiry
+CRED_MIN_LIFETIME_S = 20 * 60  # ...but never shorten a token's reported life below this
+BOTOCORE_ADVISORY_REFRESH_S = 15 * 60  # RefreshableCredentials starts refreshing this long before expiry
+
+# Fetched credentials by (pat, duration): (reported expiry epoch, credentials)
+_creds_memo: Dict[Tuple[str, str], Tuple[float, "OptlyTempCredentials"]] = {}
+_creds_memo_lock = threading.Lock()
+
+# Shared across credential refreshes so each one reuses the kept-alive TLS
+# connection; transient 429/5xx answers are retried up to 3 times (4 attempts)
+# with backoff. urllib3 ships with botocore; 1.26+ is required for allowed_methods.
+_POOL = urllib3.PoolManager(num_pools=2, maxsize=4, retries=urllib3.Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    raise_on_status=False,
+))
+CRED_API_TIMEOUT = urllib3.Timeout(connect=5, read=25)
 
 
 def _isoformat_from_millis(ms: int) -> str:
@@ -50,23 +101,37 @@ class OptlyTempCredentials:
 
 
 def fetch_optimizely_temp_creds(pat: str, duration: str, verbose: bool = False) -> OptlyTempCredentials:
-    """Call Optimizely Authentication API to obtain temporary AWS credentials and s3Path."""
+    """Call Optimizely Authentication API to obtain temporary AWS credentials and s3Path.
+
+    The reported expiry is moved up to CRED_EXPIRY_MARGIN_S early, so
+    botocore refreshes ahead of the real deadline rather than mid-burst.
+    Results are reused until they enter botocore's advisory refresh
+    window, at which point the next call fetches fresh ones.
+    """
+    with _creds_memo_lock:
+        memo = _creds_memo.get((pat, duration))
+    if memo and memo[0] - time.time() > BOTOCORE_ADVISORY_REFRESH_S:
+        return memo[1]
+
     params = {"duration": duration} if duration else {}
     headers = {"Authorization": f"Bearer {pat}"}
     try:
-        resp = requests.get(OPTLY_CRED_URL, headers=headers, params=params, timeout=30)
+        resp = _POOL.request(
+            "GET", OPTLY_CRED_URL, fields=params or None, headers=headers, timeout=CRED_API_TIMEOUT,
+        )
     except Exception as e:
         raise RuntimeError(f"Failed to call Optimizely credentials API: {e}")
 
-    if resp.status_code != 200:
+    body = resp.data.decode("utf-8", "replace")
+    if resp.status != 200:
         if verbose:
-            sys.stderr.write(f"[DEBUG] Optimizely cred API {resp.status_code}: {resp.text[:300]}\n")
-        raise RuntimeError(f"Optimizely credentials API returned {resp.status_code}.")
+            sys.stderr.write(f"[DEBUG] Optimizely cred API {resp.status}: {body[:300]}\n")
+        raise RuntimeError(f"Optimizely credentials API returned {resp.status}.")
 
     try:
-        data = resp.json()
+        data = json.loads(body)
     except json.JSONDecodeError as e:
-        raise RuntimeError(f"Invalid JSON from Optimizely credentials API: {e}\nBody: {resp.text[:200]}")
+        raise RuntimeError(f"Invalid JSON from Optimizely credentials API: {e}\nBody: {body[:200]}")
 
     creds = data.get("credentials") or {}
     for k in ("accessKeyId", "secretAccessKey", "sessionToken", "expiration"):
@@ -74,28 +139,33 @@ def fetch_optimizely_temp_creds(pat: str, duration: str, verbose: bool = False)
             raise RuntimeError("Optimizely credentials API response missing expected fields.")
 
     s3_path = data.get("s3Path")
-    return OptlyTempCredentials(
+    expires = int(creds["expiration"]) / 1000.0
+    margin = min(CRED_EXPIRY_MARGIN_S, max(0.0, expires - time.time() - CRED_MIN_LIFETIME_S))
+    result = OptlyTempCredentials(
         access_key=creds["accessKeyId"],
         secret_key=creds["secretAccessKey"],
         token=creds["sessionToken"],
-        expiry_time=_isoformat_from_millis(int(creds["expiration"])),
+        expiry_time=_isoformat_from_millis(int((expires - margin) * 1000)),
         s3_path=s3_path,
     )
+    with _creds_memo_lock:
+        _creds_memo[(pat, duration)] = (expires - margin, result)
+    return result
 
 
 # -----------------------------
 # AWS / S3 helpers
 # -----------------------------
 
-def s3_client_via_optimizely(pat: str, region_name: str, duration: str, verbose: bool = False):
+@functools.lru_cache(maxsize=4)
+def s3_client_via_optimizely(pat: str, region_name: str, duration: str, verbose: bool = False,
+                             max_pool_connections: int = DEFAULT_WORKERS):
     """Create a boto3 S3 client that auto-refreshes creds via the Optimizely Auth API.
     Returns (s3_client, initial_s3_path)
-    """
-    import boto3  # type: ignore
-    from botocore.credentials import RefreshableCredentials  # type: ignore
-    from botocore.session import get_session  # type: ignore
-    from botocore.config import Config  # type: ignore
 
+    Built once per process and argument set; RefreshableCredentials renews
+    the token in place, so the cached client never needs rebuilding.
+    """
     holder: Dict[str, Optional[str]] = {"s3_path": None}
 
     def refresh():
@@ -122,22 +192,43 @@ def s3_client_via_optimizely(pat: str, region_name: str, duration: str, verbose:
     botocore_sess.set_config_variable("region", region_name)
 
     client = boto3.Session(botocore_session=botocore_sess).client(
-        "s3", region_name=region_name, config=Config(signature_version="s3v4")
+        "s3", region_name=region_name,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=max_pool_connections,
+            retries=dict(S3_RETRIES),  # botocore rewrites this dict in place
+            tcp_keepalive=True,
+        ),
     )
     return client, holder.get("s3_path")
 
 
-def s3_client_via_static(creds: Dict[str, Optional[str]]):
-    import boto3  # type: ignore
-    from botocore.config import Config  # type: ignore
+def s3_client_via_static(creds: Dict[str, Optional[str]], max_pool_connections: int = DEFAULT_WORKERS):
+    key_id, secret = creds.get("AWS_ACCESS_KEY_ID"), creds.get("AWS_SECRET_ACCESS_KEY")
+    if not (key_id and secret):
+        key_id = secret = None
+    return _cached_static_client(
+        creds.get("AWS_REGION"), key_id, secret, creds.get("AWS_SESSION_TOKEN") or None, max_pool_connections
+    )
 
-    kwargs: Dict[str, Optional[str]] = {"region_name": creds.get("AWS_REGION")}
-    if creds.get("AWS_ACCESS_KEY_ID") and creds.get("AWS_SECRET_ACCESS_KEY"):
-        kwargs["aws_access_key_id"] = creds["AWS_ACCESS_KEY_ID"]
-        kwargs["aws_secret_access_key"] = creds["AWS_SECRET_ACCESS_KEY"]
-    if creds.get("AWS_SESSION_TOKEN"):
-        kwargs["aws_session_token"] = creds["AWS_SESSION_TOKEN"]
-    return boto3.client("s3", config=Config(signature_version="s3v4"), **kwargs)
+
+@functools.lru_cache(maxsize=4)
+def _cached_static_client(region_name: Optional[str], key_id: Optional[str], secret: Optional[str],
+                          token: Optional[str], max_pool_connections: int):
+    config = Config(
+        signature_version="s3v4",
+        max_pool_connections=max_pool_connections,
+        retries=dict(S3_RETRIES),  # botocore rewrites this dict in place
+        tcp_keepalive=True,
+    )
+    return boto3.client(
+        "s3",
+        region_name=region_name,
+        aws_access_key_id=key_id,
+        aws_secret_access_key=secret,
+        aws_session_token=token,
+        config=config,
+    )
 
 
 def load_static_creds() -> Dict[str, Optional[str]]:
@@ -166,60 +257,339 @@ def parse_s3_path(s3_path: str) -> Tuple[str, str]:
     return bucket, key
 
 
-def ensure_local_path(root_dir: str, key: str) -> str:
+def local_name(key: str) -> str:
     parts = key.split('/')
     date = next((p.split('=')[1] for p in parts if p.startswith('date=')), 'unknown')
     event = next((p.split('=')[1] for p in parts if p.startswith('event=')), 'unknown')
     filename = parts[-1]
     safe_event = event[:50].replace(' ', '_')
-    flat_name = f'{date}_{safe_event}_{filename}'
-    local_path = os.path.join(root_dir, flat_name)
-    os.makedirs(os.path.dirname(local_path), exist_ok=True)
-    return local_path
-    local_path = os.path.join(root_dir, *key.split("/"))
-    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    return f'{date}_{safe_event}_{filename}'
+
+
+def ensure_local_path(root_dir: str, key: str) -> str:
+    local_path = os.path.join(root_dir, local_name(key))
+    makedirs_once(os.path.dirname(local_path))
     return local_path
 
 
-def human_size(n: int) -> str:
-    if not n:
-        return "0B"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    i = int(math.floor(math.log(n, 1024))) if n > 0 else 0
-    return f"{n / (1024 ** i):.2f}{units[i]}"
-
-
-def daterange(start: date, end: date) -> Iterable[date]:
-    d = start
-    while d <= end:
-        yield d
-        d += timedelta(days=1)
-
-
-def list_objects(client, bucket: str, prefix: str) -> Iterable[Dict]:
-    token = None
-    while True:
-        kwargs = {"Bucket": bucket, "Prefix": prefix}
-        if token:
-            kwargs["ContinuationToken"] = token
-        resp = client.list_objects_v2(**kwargs)
-        for obj in resp.get("Contents", []):
-            yield obj
-        if resp.get("IsTruncated"):
-            token = resp.get("NextContinuationToken")
-        else:
-            break
+def day_strings(start: date, end: date) -> List[str]:
+    """ISO dates from start to end inclusive, formatted once up front."""
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def build_date_prefix(prefix: str, day: str) -> str:
+    """Key prefix of one day's export, e.g. '<prefix>date=2025-01-31/'."""
+    return f"{prefix}date={day}/"
+
+
+# What the planner keeps of each listed object; a tuple is a fraction of
+# botocore's per-object dict, which matters while days wait to be interleaved.
+S3Object = namedtuple("S3Object", "key size etag")
+
+
+def list_objects(client, bucket: str, prefix: str, start_after: Optional[str] = None) -> Iterable[Dict]:
+    """Yield objects under bucket/prefix via the ListObjectsV2 paginator."""
+    paginator = client.get_paginator("list_objects_v2")
+    extra = {"StartAfter": start_after} if start_after else {}
+    pages = paginator.paginate(
+        Bucket=bucket,
+        Prefix=prefix,
+        FetchOwner=False,
+        PaginationConfig={"PageSize": LIST_PAGE_SIZE},
+        **extra,
+    )
+    for page in pages:
+        yield from page.get("Contents", [])
+
+
+def list_split(client, bucket: str, prefix: str, workers: int = SPLIT_LIST_WORKERS) -> List[Dict]:
+    """List bucket/prefix; once the first page is truncated, list its remaining sub-prefixes concurrently."""
+    first = client.list_objects_v2(Bucket=bucket, Prefix=prefix, FetchOwner=False, MaxKeys=LIST_PAGE_SIZE)
+    listed = first.get("Contents", [])
+    if not first.get("IsTruncated"):
+        return listed
+    last = listed[-1]["Key"]
+    direct: List[Dict] = []
+    subs: List[str] = []
+    pages = client.get_paginator("list_objects_v2").paginate(
+        Bucket=bucket, Prefix=prefix, Delimiter="/", FetchOwner=False,
+        PaginationConfig={"PageSize": LIST_PAGE_SIZE},
+    )
+    for page in pages:
+        direct.extend(o for o in page.get("Contents", []) if o["Key"] > last)
+        # Keys sort lexicographically, so a sub-prefix below `last` that
+        # `last` does not start with was fully covered by the first page.
+        subs.extend(
+            cp["Prefix"] for cp in page.get("CommonPrefixes", [])
+            if cp["Prefix"] > last or last.startswith(cp["Prefix"])
+        )
+    if len(subs) < 2:
+        return listed + list(list_objects(client, bucket, prefix, start_after=last))
+
+    def list_sub(sub: str) -> List[Dict]:
+        return list(list_objects(client, bucket, sub, start_after=last if last.startswith(sub) else None))
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(subs))) as ex:
+        rest = direct + [o for part in ex.map(list_sub, subs) for o in part]
+    return listed + sorted(rest, key=lambda o: o["Key"])
+
+
+@dataclass
+class ListCache:
+    """On-disk cache of per-day LIST results, one JSON file per date.
+
+    Only days with a _SUCCESS marker are stored, since their contents are
+    final. An entry younger than `ttl` seconds is used as-is; an older one
+    is revalidated with a one-key LIST of the marker (success_marker_mtime)
+    and kept if the marker's LastModified is unchanged.
+    """
+    root: str
+    ttl: float
+
+    @classmethod
+    def for_location(cls, out_dir: str, bucket: str, prefix: str, ttl: float) -> "ListCache":
+        digest = hashlib.sha1(f"{bucket}/{prefix}".encode("utf-8")).hexdigest()[:16]
+        return cls(root=os.path.join(out_dir, ".cache", "listing", digest), ttl=ttl)
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.json")
+
+    def load(self, day: str) -> Optional[Dict]:
+        try:
+            with open(self._path(day), encoding="utf-8") as f:
+                entry = json.load(f)
+            entry["objects"] = [S3Object(o["Key"], int(o["Size"]), o.get("ETag")) for o in entry["objects"]]
+            return entry
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, day: str, success_mtime: str, objects: List[S3Object]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        entry = {
+            "fetched_at": time.time(),
+            "success_mtime": success_mtime,
+            "objects": [{"Key": o.key, "Size": o.size, "ETag": o.etag} for o in objects],
+        }
+        path = self._path(day)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+
+
+@dataclass
+class DayManifests:
+    """Per-day record of a fully downloaded day: {local file name: size}.
+
+    Written only for days with a _SUCCESS marker once every file is on disk
+    at its listed size. While the files still match, later runs skip that
+    day without any S3 request. Scoped by bucket/prefix like ListCache, so
+    runs for another --type or account into the same out dir are unaffected.
+    """
+    out_dir: str
+    root: str
 
+    @classmethod
+    def for_location(cls, out_dir: str, bucket: str, prefix: str) -> "DayManifests":
+        digest = hashlib.sha1(f"{bucket}/{prefix}".encode("utf-8")).hexdigest()[:16]
+        return cls(out_dir=out_dir, root=os.path.join(out_dir, ".manifests", digest))
 
-def success_marker_exists(client, bucket: str, date_prefix: str, verbose: bool = False) -> bool:
+    def _path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.json")
+
+    def is_complete(self, day: str, local_index: Dict[str, int]) -> Optional[Dict[str, int]]:
+        """The day's manifest if all its files are present at the recorded sizes, else None."""
+        try:
+            with open(self._path(day), encoding="utf-8") as f:
+                files = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not files or any(local_index.get(os.path.join(self.out_dir, n)) != size for n, size in files.items()):
+            return None
+        return files
+
+    def store(self, day: str, files: Dict[str, int]) -> None:
+        path = self._path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(files, f)
+        os.replace(path + ".tmp", path)
+
+
+def _mtime_key(dt: datetime) -> str:
+    # Compare at second precision; LIST reports milliseconds.
+    return dt.replace(microsecond=0).isoformat()
+
+
+def success_marker_mtime(client, bucket: str, date_prefix: str, verbose: bool = False) -> Optional[str]:
+    """LastModified of the day's _SUCCESS marker, or None if it is missing.
+
+    A one-key LIST rather than a HEAD: a missing marker is an empty answer
+    instead of a 404 exception, and it works with list-only credentials.
+    """
     key = date_prefix + "_SUCCESS"
     try:
-        client.head_object(Bucket=bucket, Key=key)
-        return True
+        resp = client.list_objects_v2(Bucket=bucket, Prefix=key, MaxKeys=1, FetchOwner=False)
     except Exception as e:
         if verbose:
-            sys.stderr.write(f"[DEBUG] HEAD s3://{bucket}/{key} failed: {e}\n")
-        return False
+            sys.stderr.write(f"[DEBUG] LIST s3://{bucket}/{key} failed: {e}\n")
+        return None
+    found = resp.get("Contents", [])
+    if not found or found[0]["Key"] != key:
+        if verbose:
+            sys.stderr.write(f"[DEBUG] s3://{bucket}/{key} not found\n")
+        return None
+    return _mtime_key(found[0]["LastModified"])
+
+
+def probe_day(
+    client, bucket: str, prefix: str, day: str, require_success: bool, verbose: bool = False,
+    cache: Optional[ListCache] = None,
+) -> Tuple[str, bool, List[S3Object]]:
+    """List one day's prefix, returning (ISO date, has _SUCCESS marker, parquet objects).
+
+    The marker comes from the same LIST as the parquet files; with a `cache`, complete days are read from disk.
+    """
+    date_prefix = build_date_prefix(prefix, day)
+    cached = cache.load(day) if cache else None
+    if cached:
+        if time.time() - cached.get("fetched_at", 0) < cache.ttl:
+            return day, True, cached["objects"]
+        if success_marker_mtime(client, bucket, date_prefix, verbose=verbose) == cached.get("success_mtime"):
+            cache.store(day, cached["success_mtime"], cached["objects"])
+            return day, True, cached["objects"]
+
+    return _day_result(
+        bucket, day, date_prefix, list_split(client, bucket, date_prefix), require_success, verbose, cache
+    )
+
+
+def _day_result(
+    bucket: str, day: str, date_prefix: str, listed: Iterable[Dict], require_success: bool,
+    verbose: bool = False, cache: Optional[ListCache] = None,
+) -> Tuple[str, bool, List[S3Object]]:
+    # Split one day's listing into its _SUCCESS marker and parquet files.
+    marker = date_prefix + "_SUCCESS"
+    success_mtime: Optional[str] = None
+    day_objs: List[S3Object] = []
+    for o in listed:
+        key = o.get("Key", "")
+        if key == marker:
+            success_mtime = _mtime_key(o["LastModified"])
+        elif key.endswith(".parquet"):
+            day_objs.append(S3Object(key, int(o.get("Size", 0)), o.get("ETag")))
+    has_success = success_mtime is not None
+    if verbose and not has_success:
+        sys.stderr.write(f"[DEBUG] s3://{bucket}/{marker} not found\n")
+    if not has_success and require_success:
+        return day, has_success, []
+    if has_success and cache:
+        cache.store(day, success_mtime, day_objs)
+    return day, has_success, day_objs
+
+
+def iter_range_listing(
+    client, bucket: str, prefix: str, days: List[str], require_success: bool,
+    verbose: bool = False, cache: Optional[ListCache] = None,
+) -> Iterable[Tuple[str, bool, List[S3Object]]]:
+    """List the whole date range in one serial pass, yielding probe_day-style results in date order.
+
+    Costs ~keys/1000 requests instead of one per day; `cache` is written but not read.
+    """
+    base = prefix + "date="
+    wanted = set(days)
+    remaining = iter(days)
+    listed = read_ahead(list_objects(client, bucket, base, start_after=base + days[0]))
+    for day, objs in groupby(listed, key=lambda o: o["Key"][len(base):].split("/", 1)[0]):
+        if day > days[-1]:
+            break
+        if day not in wanted:
+            continue
+        for missing in remaining:
+            if missing == day:
+                break
+            yield _day_result(bucket, missing, build_date_prefix(prefix, missing), (), require_success, verbose)
+        yield _day_result(bucket, day, build_date_prefix(prefix, day), objs, require_success, verbose, cache)
+    for missing in remaining:
+        yield _day_result(bucket, missing, build_date_prefix(prefix, missing), (), require_success, verbose)
+
+
+def iter_probes(
+    client, bucket: str, prefix: str, days: Iterable[str], require_success: bool,
+    verbose: bool = False, workers: int = DEFAULT_WORKERS, cache: Optional[ListCache] = None,
+) -> Iterable[Tuple[str, bool, List[S3Object]]]:
+    """Run probe_day concurrently and yield results in date order.
+
+    At most `workers` days are probed ahead of the consumer, so memory stays
+    bounded by a few days of keys rather than the whole range.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        window = deque()
+        for day in days:
+            window.append(ex.submit(probe_day, client, bucket, prefix, day, require_success, verbose, cache))
+            if len(window) >= workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def interleave(day_lists: List[List[S3Object]]) -> Iterable[S3Object]:
+    """Yield one object from each day in turn (round-robin)."""
+    for group in zip_longest(*day_lists):
+        yield from (obj for obj in group if obj is not None)
+
+
+def plan_objects(
+    client, bucket: str, prefix: str, start: date, end: date, require_success: bool,
+    totals: Dict[str, int], verbose: bool = False, workers: int = DEFAULT_WORKERS,
+    interleave_days: int = DEFAULT_INTERLEAVE_DAYS, cache: Optional[ListCache] = None,
+    single_list: bool = False, manifests: Optional[DayManifests] = None,
+    local_index: Optional[Dict[str, int]] = None, planned: Optional[Dict[str, Dict[str, int]]] = None,
+) -> Iterable[S3Object]:
+    """Yield parquet objects for each eligible day, `interleave_days` days round-robin, tallying `totals`.
+
+    Days complete per `manifests` are skipped unlisted; listed _SUCCESS days are recorded in `planned`.
+    """
+    days = day_strings(start, end)
+    if manifests is not None:
+        pending = []
+        for day in days:
+            files = manifests.is_complete(day, local_index or {})
+            if files is None:
+                pending.append(day)
+                continue
+            log.info(f"[SKIP] {build_date_prefix(prefix, day)} — {len(files)} file(s) already downloaded (manifest)")
+            totals["files"] += len(files)
+            totals["bytes"] += sum(files.values())
+            totals["up_to_date"] = totals.get("up_to_date", 0) + len(files)
+        days = pending
+    if not days:
+        return
+    if single_list:
+        results = iter_range_listing(client, bucket, prefix, days, require_success, verbose=verbose, cache=cache)
+    else:
+        results = iter_probes(
+            client, bucket, prefix, days, require_success, verbose=verbose, workers=workers, cache=cache,
+        )
+    batch: List[List[S3Object]] = []
+    for day, has_success, day_objs in results:
+        date_prefix = build_date_prefix(prefix, day)
+        if not has_success and require_success:
+            log.info(f"[INFO] {date_prefix} — no _SUCCESS, skipping")
+            continue
+        if not day_objs:
+            log.info(f"[WARN] {date_prefix} — no parquet files found")
+            continue
+        day_bytes = sum(o.size for o in day_objs)
+        log.info(f"[INFO] {date_prefix} — {len(day_objs)} parquet file(s) (~{human_size(day_bytes)})")
+        totals["files"] += len(day_objs)
+        totals["bytes"] += day_bytes
+        if planned is not None and has_success:
+            planned[day] = {local_name(o.key): o.size for o in day_objs}
+        batch.append(day_objs)
+        if len(batch) >= interleave_days:
+            yield from interleave(batch)
+            batch = []
+    yield from interleave(batch)
 
 
 # -----------------------------
@@ -262,30 +632,48 @@ def build_arg_parser() -> argparse.ArgumentParser:
                    help="Only process days that have a _SUCCESS marker (default)")
     p.add_argument("--ignore-success", dest="require_success", action="store_false",
                    help="Process days even if _SUCCESS is missing")
+    p.add_argument("--workers", type=positive_int, default=DEFAULT_WORKERS,
+                   help=f"Concurrent downloads (default: {DEFAULT_WORKERS})")
+    p.add_argument("--multipart-chunksize", type=positive_int, default=DEFAULT_MULTIPART_CHUNKSIZE_MB,
+                   help=f"Byte-range part size in MB for large objects (default: {DEFAULT_MULTIPART_CHUNKSIZE_MB})")
+    p.add_argument("--max-concurrency", type=positive_int, default=DEFAULT_MAX_CONCURRENCY,
+                   help=f"Max in-flight GET requests across all downloads (default: {DEFAULT_MAX_CONCURRENCY})")
+    p.add_argument("--interleave-days", type=positive_int, default=DEFAULT_INTERLEAVE_DAYS,
+                   help=("Mix downloads from this many consecutive days so requests spread across "
+                         f"date= prefixes (default: {DEFAULT_INTERLEAVE_DAYS}; 1 = day by day)"))
+    p.add_argument("--list-cache-ttl", type=float, default=DEFAULT_LIST_CACHE_TTL_MIN,
+                   help=("Minutes to reuse cached per-day listings under <out-dir>/.cache/ before "
+                         f"revalidating via _SUCCESS (default: {DEFAULT_LIST_CACHE_TTL_MIN}; 0 disables)"))
+    p.add_argument("--single-list", action="store_true",
+                   help=("List the whole date range in one serial pass instead of one LIST per day "
+                         "(fewer requests when days hold few files; the list cache is refreshed, not read)"))
+    p.add_argument("--verify", action="store_true",
+                   help="Checksum same-size local files against S3 (ETag/CRC32C) before skipping them")
+    p.add_argument("--force", action="store_true",
+                   help="Re-download every object without checking for existing local files")
+    p.add_argument("--log-every", type=positive_int, default=1,
+                   help="Log SKIP/GET progress for every Nth object only (default: 1, every object)")
     p.add_argument("--verbose", action="store_true", help="Print debug details")
 
     return p
 
 
 def validate_prefix_endswith(prefix: str, partition_type: str) -> None:
-    acceptable = ("type=decisions/", "type=events/", "type=decisions-rerun/")
-    if not any(prefix.endswith(s) for s in acceptable):
+    if not prefix.endswith(PARTITION_SUFFIXES):
         raise ValueError(
             "--prefix must end with one of 'type=decisions/', 'type=events/', or 'type=decisions-rerun/'"
         )
     if partition_type == "events" and not prefix.endswith("type=events/"):
         raise ValueError("--type events requires --prefix to end with 'type=events/'")
-    if partition_type == "decisions" and not (prefix.endswith("type=decisions/") or prefix.endswith("type=decisions-rerun/")):
+    if partition_type == "decisions" and not prefix.endswith(("type=decisions/", "type=decisions-rerun/")):
         raise ValueError("--type decisions requires --prefix to end with 'type=decisions/' or 'type=decisions-rerun/'")
 
 
 def compute_bucket_and_prefix(args, s3_path_hint: Optional[str]) -> Tuple[str, str]:
-    # If user supplied a full prefix, prefer it.
+    # If user supplied a full prefix, prefer it (main() has already normalised and validated it).
     if args.prefix:
-        prefix = args.prefix if args.prefix.endswith("/") else args.prefix + "/"
-        validate_prefix_endswith(prefix, args.partition_type)
         bucket = args.bucket or DEFAULT_BUCKET
-        return bucket, prefix
+        return bucket, args.prefix
 
     # No explicit prefix. Try to derive from Optimizely s3Path hint first.
     base_bucket = None
@@ -300,12 +688,12 @@ def compute_bucket_and_prefix(args, s3_path_hint: Optional[str]) -> Tuple[str, s
 
     # Determine account base prefix (v1/account_id=.../)
     account_base = None
-    if base_key and re.search(r"v1/account_id=\d+/?$", base_key):
+    if base_key and ACCOUNT_BASE_EXACT_REGEX.search(base_key):
         # base_key is exactly 'v1/account_id=123/'
         account_base = base_key
-    elif base_key and re.search(r"v1/account_id=\d+/", base_key):
+    elif base_key and ACCOUNT_BASE_REGEX.search(base_key):
         # Trim to v1/account_id=.../
-        m = re.match(r"(v1/account_id=\d+/)", base_key)
+        m = ACCOUNT_BASE_REGEX.match(base_key)
         if m:
             account_base = m.group(1)
 
@@ -337,21 +725,34 @@ def main() -> None:
     if end < start:
         sys.exit("ERROR: --end-date cannot be earlier than --start-date")
 
-    # Build S3 client
+    # An explicit --prefix is checked up front, before any credential or S3 call.
+    if args.prefix:
+        args.prefix = args.prefix if args.prefix.endswith("/") else args.prefix + "/"
+        try:
+            validate_prefix_endswith(args.prefix, args.partition_type)
+        except ValueError as e:
+            sys.exit(f"ERROR: {e}")
+
+    # Build S3 client. It serves up to --workers day probes (each splitting into
+    # SPLIT_LIST_WORKERS listings when large), --workers small-object GETs and
+    # --max-concurrency ranged GETs (the TransferManager's pool is shared, so
+    # not workers x max-concurrency) at the same time.
+    pool_size = args.workers * (SPLIT_LIST_WORKERS + 1) + args.max_concurrency
     s3_path_hint: Optional[str] = None
     if args.auth == "optimizely":
         pat = args.pat or os.getenv("OPTIMIZELY_PAT")
         if not pat:
             sys.exit("ERROR: --pat is required for --auth optimizely (or set OPTIMIZELY_PAT)")
         s3, s3_path_hint = s3_client_via_optimizely(
-            pat=pat, region_name=args.region, duration=args.duration, verbose=args.verbose
+            pat=pat, region_name=args.region, duration=args.duration, verbose=args.verbose,
+            max_pool_connections=pool_size,
         )
         print("[OK] Using Optimizely temporary AWS credentials (auto-refresh).")
     else:
         static = load_static_creds()
         if not (static["AWS_ACCESS_KEY_ID"] and static["AWS_SECRET_ACCESS_KEY"]):
             sys.exit("ERROR: Missing AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY for --auth aws")
-        s3 = s3_client_via_static(static)
+        s3 = s3_client_via_static(static, max_pool_connections=pool_size)
         print("[OK] Using static AWS credentials from environment.")
 
     # Determine bucket/prefix
@@ -367,55 +768,60 @@ def main() -> None:
     print(f" Dates: {start} → {end}")
     print(f" Out dir: {os.path.abspath(args.out_dir)}")
     print(f" Dry run: {args.dry_run}")
+    print(f" Workers: {args.workers}")
     print(f" Require _SUCCESS: {args.require_success}\n")
 
-    all_objects: List[Dict] = []
-    for d in daterange(start, end):
-        date_prefix = prefix + f"date={d.isoformat()}/"
-        has_success = success_marker_exists(s3, bucket, date_prefix, verbose=args.verbose)
-        if not has_success and args.require_success:
-            print(f"[INFO] {date_prefix} — no _SUCCESS, skipping")
-            continue
-        day_objs = [o for o in list_objects(s3, bucket, date_prefix) if o.get("Key", "").endswith(".parquet")]
-        if not day_objs:
-            print(f"[WARN] {date_prefix} — no parquet files found")
-            continue
-        print(f"[INFO] {date_prefix} — {len(day_objs)} parquet file(s)")
-        all_objects.extend(day_objs)
+    # Days are probed concurrently and their objects stream straight into the
+    # download workers, so downloads start before the whole range is listed.
+    totals = {"files": 0, "bytes": 0}
+    cache = None
+    if args.list_cache_ttl > 0:
+        cache = ListCache.for_location(args.out_dir, bucket, prefix, ttl=args.list_cache_ttl * 60)
+    # --force and --verify both mean "look again", so neither trusts a manifest.
+    day_manifests = DayManifests.for_location(args.out_dir, bucket, prefix)
+    manifests = None if (args.force or args.verify) else day_manifests
+    # Downloads are flattened into out_dir, so one scandir indexes every local file.
+    local_index = {} if args.force else dir_sizes(args.out_dir)
+    planned: Dict[str, Dict[str, int]] = {}
+    objects = plan_objects(
+        s3, bucket, prefix, start, end, args.require_success, totals,
+        verbose=args.verbose, workers=args.workers, interleave_days=args.interleave_days, cache=cache,
+        single_list=args.single_list, manifests=manifests, local_index=local_index, planned=planned,
+    )
+    listener = start_progress_log()
+    try:
+        ok, skipped, failed = download_objects(
+            client=s3,
+            bucket=bucket,
+            objects=objects,
+            local_path_for=lambda key: ensure_local_path(args.out_dir, key),
+            dry_run=args.dry_run,
+            workers=args.workers,
+            multipart_chunksize=args.multipart_chunksize * 1024 * 1024,
+            max_concurrency=args.max_concurrency,
+            verify=args.verify,
+            force=args.force,
+            log_every=args.log_every,
+            local_index=local_index,
+        )
+    finally:
+        listener.stop()
 
-    if not all_objects:
+    # Record days whose files are now all on disk, so the next run skips them.
+    if planned and not args.dry_run:
+        on_disk = dir_sizes(args.out_dir)
+        for day, files in planned.items():
+            if all(on_disk.get(os.path.join(args.out_dir, n)) == size for n, size in files.items()):
+                day_manifests.store(day, files)
+
+    if not totals["files"]:
         print("[WARN] No files found to download in the selected range.")
         sys.exit(0)
 
-    all_objects.sort(key=lambda o: o.get("Key", ""))
-    total_bytes = sum(int(o.get("Size", 0)) for o in all_objects)
-    print(f"\n[INFO] Total files: {len(all_objects)} (~{human_size(total_bytes)})\n")
-
-    ok = skipped = failed = 0
-    for idx, obj in enumerate(all_objects, 1):
-        key = obj.get("Key", "")
-        size = int(obj.get("Size", 0))
-        if key.endswith("/") or not key:
-            continue
-        local_path = ensure_local_path(args.out_dir, key)
-        if os.path.exists(local_path) and os.path.getsize(local_path) == size:
-            skipped += 1
-            print(f"[{idx}/{len(all_objects)}] SKIP {key} ({human_size(size)})")
-            continue
-        print(f"[{idx}/{len(all_objects)}] GET {key} -> {local_path} ({human_size(size)})")
-        if args.dry_run:
-            ok += 1
-            continue
-        try:
-            s3.download_file(bucket, key, local_path)
-            ok += 1
-        except Exception as e:
-            failed += 1
-            sys.stderr.write(f"[ERROR] Failed to download {key}: {e}\n")
-
     print("\nSummary:")
+    print(f" Listed:     {totals['files']} (~{human_size(totals['bytes'])})")
     print(f" Downloaded: {ok}")
-    print(f" Skipped:    {skipped}")
+    print(f" Skipped:    {skipped + totals.get('up_to_date', 0)}")
     print(f" Failed:     {failed}")
     print(f" Output:     {os.path.abspath(args.out_dir)}")
 
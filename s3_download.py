@@ -0,0 +1,322 @@
+# s3_download.py
+# Download engine shared by extract_optimizely_s3.py and load_optimizely_decisions_v3.py.
+import os
+import sys
+import base64
+import hashlib
+import shutil
+import argparse
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from s3transfer.subscribers import BaseSubscriber
+from s3transfer.utils import S3_RETRYABLE_DOWNLOAD_ERRORS
+
+# Optional: hardware-accelerated CRC32C for --verify on multipart objects
+try:
+    import crc32c  # pip install crc32c
+except ImportError:
+    crc32c = None
+
+DEFAULT_WORKERS = 16  # concurrent downloads; also sizes the S3 connection pool
+DEFAULT_MULTIPART_CHUNKSIZE_MB = 8  # objects above this are fetched as parallel byte-range GETs
+DEFAULT_MAX_CONCURRENCY = 16  # in-flight ranged GETs across all transfers
+S3_RETRIES = {"max_attempts": 10, "mode": "adaptive"}  # client-side rate limiting on SlowDown/503
+LIST_PAGE_SIZE = 1000  # ListObjectsV2 maximum keys per page
+LIST_READ_AHEAD = 1024  # keys buffered ahead of the consumer on serial listings (about one page)
+QUEUE_DEPTH_PER_WORKER = 4  # listed objects buffered per download worker while streaming
+HASH_CHUNK_SIZE = 1024 * 1024  # read size when checksumming local files for --verify
+COPY_BUFFER_SIZE = 1024 * 1024  # read/write size for streamed object bodies, whole or per part
+SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")  # human_size() units, one per power of 1024
+STREAM_ATTEMPTS = 5  # same as TransferConfig.num_download_attempts
+
+# Progress lines emitted while downloads run; see start_progress_log().
+log = logging.getLogger("optimizely_s3")
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return n
+
+
+def human_size(n: Optional[int]) -> str:
+    if not n or n < 0:
+        return "0B"
+    # floor(log1024(n)) from the bit length: pure int ops, no float log.
+    i = min((n.bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+    return f"{n / (1 << (10 * i)):.2f}{SIZE_UNITS[i]}"
+
+
+def start_progress_log() -> QueueListener:
+    """Route `log` through a queue drained by one thread; stop the listener to flush.
+
+    INFO goes to stdout, WARNING and above to stderr.
+    """
+    out = logging.StreamHandler(sys.stdout)
+    out.addFilter(lambda record: record.levelno < logging.WARNING)
+    err = logging.StreamHandler(sys.stderr)
+    err.setLevel(logging.WARNING)
+    for handler in (out, err):
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    log.handlers[:] = [QueueHandler(q)]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener = QueueListener(q, out, err, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def read_ahead(items: Iterable, depth: int = LIST_READ_AHEAD) -> Iterable:
+    """Drain `items` on a producer thread through a bounded queue, re-raising its errors.
+
+    A serial paginated listing then fetches its next page while the caller consumes the last.
+    """
+    buf: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+    failure: List[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                buf.put(item)
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            buf.put(done)
+
+    t = threading.Thread(target=produce, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = buf.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        while t.is_alive():
+            try:
+                buf.get_nowait()
+            except queue.Empty:
+                t.join(0.05)
+    if failure:
+        raise failure[0]
+
+
+# Parent directories already created by makedirs_once(); most keys share one.
+_created_dirs: set = set()
+_created_dirs_lock = threading.Lock()
+
+
+def makedirs_once(path: str) -> None:
+    if path in _created_dirs:
+        return
+    with _created_dirs_lock:
+        if path not in _created_dirs:
+            os.makedirs(path, exist_ok=True)
+            _created_dirs.add(path)
+
+
+def dir_sizes(path: str) -> Dict[str, int]:
+    """Map each file directly in `path` to its size, in one scandir."""
+    try:
+        with os.scandir(path) as it:
+            return {e.path: e.stat().st_size for e in it if e.is_file()}
+    except FileNotFoundError:
+        return {}
+
+
+def transfer_manager(client, multipart_chunksize: int, max_concurrency: int):
+    """One TransferManager for the run; `max_concurrency` bounds its ranged GETs across all files."""
+    config = TransferConfig(
+        multipart_threshold=multipart_chunksize,
+        multipart_chunksize=multipart_chunksize,
+        max_concurrency=max_concurrency,
+        # Each ranged GET is read and queued for the writer in io_chunksize
+        # pieces; 1 MiB instead of 256 KiB means a quarter of the queue hops.
+        io_chunksize=COPY_BUFFER_SIZE,
+        use_threads=True,
+    )
+    return create_transfer_manager(client, config)
+
+
+class _ProvideSize(BaseSubscriber):
+    # Size and ETag are known from LIST; passing them on saves the HEAD s3transfer would issue.
+    def __init__(self, size: int, etag: Optional[str]):
+        self._size = size
+        self._etag = etag
+
+    def on_queued(self, future, **kwargs):
+        future.meta.provide_transfer_size(self._size)
+        if self._etag and hasattr(future.meta, "provide_object_etag"):  # s3transfer >= 0.11
+            future.meta.provide_object_etag(self._etag)
+
+
+def _fetch(tm, bucket: str, key: str, local_path: str, size: int, etag: Optional[str]) -> None:
+    tm.download(bucket, key, local_path, subscribers=[_ProvideSize(size, etag)]).result()
+
+
+def _get_small(client, bucket: str, key: str, local_path: str) -> None:
+    # Below the multipart threshold one GetObject streamed straight into the
+    # final path beats the TransferManager's future/temp-file/rename setup.
+    try:
+        for attempt in range(1, STREAM_ATTEMPTS + 1):
+            try:
+                body = client.get_object(Bucket=bucket, Key=key)["Body"]
+                with body, open(local_path, "wb") as f:
+                    shutil.copyfileobj(body, f, COPY_BUFFER_SIZE)
+                return
+            except S3_RETRYABLE_DOWNLOAD_ERRORS:
+                # botocore retries the request itself; this covers drops mid-body.
+                if attempt == STREAM_ATTEMPTS:
+                    raise
+    except BaseException:
+        # A truncated file would otherwise pass for a finished one on rerun.
+        try:
+            os.remove(local_path)
+        except OSError:
+            pass
+        raise
+
+
+def local_matches_remote(client, bucket: str, key: str, local_path: str, etag: Optional[str]) -> Optional[bool]:
+    """Check a same-size local file against S3: MD5 for single-part ETags, else full-object CRC32C.
+
+    Returns None when there is nothing to compare (multipart without the crc32c package or checksum).
+    """
+    etag = (etag or "").strip('"')
+    if etag and "-" not in etag:
+        md5 = hashlib.md5(usedforsecurity=False)
+        with open(local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                md5.update(chunk)
+        return md5.hexdigest() == etag
+    if crc32c is None:
+        return None
+    head = client.head_object(Bucket=bucket, Key=key, ChecksumMode="ENABLED")
+    remote = head.get("ChecksumCRC32C")
+    # Composite (per-part) checksums look like "<b64>-N" and can't be recomputed locally.
+    if not remote or "-" in remote or head.get("ChecksumType", "FULL_OBJECT") != "FULL_OBJECT":
+        return None
+    value = 0
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            value = crc32c.crc32c(chunk, value)
+    return base64.b64encode(value.to_bytes(4, "big")).decode() == remote
+
+
+def download_objects(
+    client,
+    bucket: str,
+    objects: Iterable[Tuple[str, int, Optional[str]]],
+    local_path_for: Callable[[str], str],
+    dry_run: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    multipart_chunksize: int = DEFAULT_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    verify: bool = False,
+    force: bool = False,
+    local_index: Optional[Dict[str, int]] = None,
+    log_every: int = 1,
+) -> Tuple[int, int, int]:
+    """Download (key, size, etag) objects as they stream in on `workers` threads; returns (ok, skipped, failed).
+
+    Same-size local files are skipped (checksummed first with `verify`), unless `force`.
+    """
+    ok = skipped = 0
+    results = {"ok": 0, "skipped": 0, "failed": 0}
+    lock = threading.Lock()
+    work: queue.Queue = queue.Queue(maxsize=workers * QUEUE_DEPTH_PER_WORKER)
+    # Without a prebuilt index, directories are scanned lazily as the listing reaches them.
+    local_dirs: Dict[str, Dict[str, int]] = {}
+    tm = transfer_manager(client, multipart_chunksize, max_concurrency)
+
+    def local_size(path: str) -> Optional[int]:
+        if force:
+            return None
+        if local_index is not None:
+            return local_index.get(path)
+        parent = os.path.dirname(path)
+        if parent not in local_dirs:
+            local_dirs[parent] = dir_sizes(parent)
+        return local_dirs[parent].get(path)
+
+    def worker() -> None:
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            idx, key, local_path, size, etag, check = item
+            if check:
+                try:
+                    match = local_matches_remote(client, bucket, key, local_path, etag)
+                except Exception as e:
+                    match = None
+                    log.warning(f"[WARN] Could not verify {key}, trusting size match: {e}")
+                if match is not False:
+                    how = "verified" if match else "size match"
+                    if idx % log_every == 0:
+                        log.info(f"[{idx}] SKIP {key} ({human_size(size)}, {how})")
+                    with lock:
+                        results["skipped"] += 1
+                    continue
+                log.info(f"[{idx}] GET {key} -> {local_path} ({human_size(size)}, checksum mismatch)")
+            try:
+                if size < multipart_chunksize:
+                    _get_small(client, bucket, key, local_path)
+                else:
+                    _fetch(tm, bucket, key, local_path, size, etag)
+                outcome = "ok"
+            except Exception as e:
+                outcome = "failed"
+                log.error(f"[ERROR] Failed to download {key}: {e}")
+            with lock:
+                results[outcome] += 1
+
+    with tm:
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        try:
+            for idx, (key, size, etag) in enumerate(objects, 1):
+                if key.endswith("/") or not key:
+                    continue
+                local_path = local_path_for(key)
+                if local_size(local_path) == size:
+                    if verify and not dry_run:
+                        work.put((idx, key, local_path, size, etag, True))
+                        continue
+                    skipped += 1
+                    if idx % log_every == 0:
+                        log.info(f"[{idx}] SKIP {key} ({human_size(size)})")
+                    continue
+                if idx % log_every == 0:
+                    log.info(f"[{idx}] GET {key} -> {local_path} ({human_size(size)})")
+                if dry_run:
+                    ok += 1
+                    continue
+                work.put((idx, key, local_path, size, etag, False))
+        except BaseException:
+            # Listing failed or Ctrl-C: drop queued objects so workers stop after their current one.
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    break
+            raise
+        finally:
+            for _ in threads:
+                work.put(None)
+            for t in threads:
+                t.join()
+    return ok + results["ok"], skipped + results["skipped"], results["failed"]
@@ -1,12 +1,24 @@
 # stage_and_load_to_bq.py
 import os
 import sys
+import functools
 import pathlib
-from typing import List, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable, Tuple
 
 from google.cloud import storage
 from google.cloud import bigquery
-from google.api_core.exceptions import NotFound
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+def positive_env_int(name: str, default: int) -> int:
+    value = os.getenv(name, str(default))
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise SystemExit(f"[ERROR] {name} must be a positive integer, got {value!r}")
+    return n
 
 # ---- CONFIG ----
 PROJECT_ID   = os.getenv("GCP_PROJECT_ID", "<your-gcp-project-id>")
@@ -16,11 +28,21 @@ GCS_PREFIX   = os.getenv("GCS_PREFIX", "events/")                   # a folder i
 BQ_DATASET   = os.getenv("BQ_DATASET", "optimizely_e3")
 BQ_TABLE_RAW = os.getenv("BQ_TABLE_RAW", "event_data_with_user_agents")
 LOCATION     = os.getenv("BQ_LOCATION", "EU")  # BigQuery dataset + GCS bucket should be the same region
+UPLOAD_WORKERS = positive_env_int("GCS_UPLOAD_WORKERS", 32)  # concurrent uploads; the GCS client is thread-safe
 
 
 # Max 10,000 URIs per BigQuery load job; stay well under the limit
 CHUNK_SIZE = 9000
 
+# One client per project/location for the whole run, so auth and connection pools are shared
+@functools.lru_cache(maxsize=None)
+def get_storage_client(project_id: str) -> storage.Client:
+    return storage.Client(project=project_id)
+
+@functools.lru_cache(maxsize=None)
+def get_bq_client(project_id: str, location: str) -> bigquery.Client:
+    return bigquery.Client(project=project_id, location=location)
+
 def ensure_bucket(client: storage.Client, bucket_name: str, location: str) -> storage.Bucket:
     try:
         return client.get_bucket(bucket_name)
@@ -37,38 +59,53 @@ def ensure_dataset(client: bigquery.Client, project_id: str, dataset_id: str, lo
         ds_ref.location = location
         return client.create_dataset(ds_ref)
 
-def iter_local_parquet(root: pathlib.Path) -> Iterable[pathlib.Path]:
-    for p in root.rglob("*.parquet"):
-        if p.is_file():
-            yield p
+def iter_local_parquet(root: pathlib.Path) -> Iterable[Tuple[pathlib.Path, int]]:
+    """Yield (path, size) for every .parquet file under root.
+
+    Walks with os.scandir so each file costs at most one stat (none on
+    Windows, where DirEntry carries the size), instead of is_file() + stat().
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(pathlib.Path(entry.path))
+                elif entry.name.endswith(".parquet") and entry.is_file():
+                    yield pathlib.Path(entry.path), entry.stat().st_size
 
 def upload_to_gcs(local_root: pathlib.Path, bucket: storage.Bucket, gcs_prefix: str) -> List[str]:
     """
     Upload .parquet files under local_root to gs://bucket/gcs_prefix/<relative path>
     Returns the list of gs:// URIs uploaded (in the same order).
+    Uploads run on UPLOAD_WORKERS threads; their UP/SKIP lines are printed
+    here, one per file in order, so output from different threads never mixes.
     """
-    uris = []
-    for idx, fpath in enumerate(iter_local_parquet(local_root), 1):
+    def upload_one(item: Tuple[int, Tuple[pathlib.Path, int]]) -> Tuple[str, str]:
+        idx, (fpath, size_on_disk) = item
         rel = fpath.relative_to(local_root)
         # Always use '/' for GCS keys
-        gcs_key = f"{gcs_prefix.rstrip('/')}/{str(rel).replace('\\', '/')}"
-        blob = bucket.blob(gcs_key)
-
-        # Skip if same size already there
-        size_on_disk = fpath.stat().st_size
-        needs_upload = True
-        if blob.exists():
-            blob.reload()
-            if blob.size == size_on_disk:
-                needs_upload = False
-
-        if needs_upload:
-            print(f"[{idx}] UP   {fpath}  -> gs://{bucket.name}/{gcs_key}")
-            blob.upload_from_filename(str(fpath))
-        else:
-            print(f"[{idx}] SKIP {fpath}  (already in GCS with same size)")
-
-        uris.append(f"gs://{bucket.name}/{gcs_key}")
+        gcs_key = f"{gcs_prefix.rstrip('/')}/{rel.as_posix()}"
+        uri = f"gs://{bucket.name}/{gcs_key}"
+
+        # Skip if same size already there; get_blob() is one metadata request and None if absent
+        blob = bucket.get_blob(gcs_key)
+        if blob is not None and blob.size == size_on_disk:
+            return uri, f"[{idx}] SKIP {fpath}  (already in GCS with same size)"
+
+        # Only create when absent, or replace the exact generation we just looked at
+        generation = 0 if blob is None else blob.generation
+        try:
+            (blob or bucket.blob(gcs_key)).upload_from_filename(str(fpath), if_generation_match=generation)
+        except PreconditionFailed:
+            return uri, f"[{idx}] SKIP {fpath}  (changed in GCS during upload; keeping that copy)"
+        return uri, f"[{idx}] UP   {fpath}  -> {uri}"
+
+    uris = []
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as ex:
+        for uri, message in ex.map(upload_one, enumerate(iter_local_parquet(local_root), 1)):
+            print(message)
+            uris.append(uri)
     return uris
 
 def chunks(lst: List[str], n: int) -> Iterable[List[str]]:
@@ -76,7 +113,7 @@ def chunks(lst: List[str], n: int) -> Iterable[List[str]]:
         yield lst[i:i+n]
 
 def load_parquet_to_bq(uris: List[str], project_id: str, dataset_id: str, table_id: str, location: str = "EU"):
-    client = bigquery.Client(project=project_id, location=location)
+    client = get_bq_client(project_id, location)
     table_fq = f"{project_id}.{dataset_id}.{table_id}"
 
     # Create table if not exists by running an empty load with WRITE_APPEND, or just let BigQuery create on first load
@@ -115,12 +152,12 @@ def main():
         sys.exit(1)
 
     # GCS
-    storage_client = storage.Client(project=PROJECT_ID)
+    storage_client = get_storage_client(PROJECT_ID)
     bucket = ensure_bucket(storage_client, GCS_BUCKET, LOCATION)
     print(f"[OK] Using GCS bucket: gs://{bucket.name} (location={bucket.location})")
 
     # BQ dataset
-    bq_client = bigquery.Client(project=PROJECT_ID, location=LOCATION)
+    bq_client = get_bq_client(PROJECT_ID, LOCATION)
     ensure_dataset(bq_client, PROJECT_ID, BQ_DATASET, LOCATION)
     print(f"[OK] Using BigQuery dataset: {PROJECT_ID}.{BQ_DATASET} (location={LOCATION})")
 
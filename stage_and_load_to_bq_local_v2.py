@@ -1,9 +1,17 @@
 
 import argparse
-import os
+import itertools
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google.cloud import bigquery
 
 # ---- CLI ARGUMENTS ----
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return n
+
 parser = argparse.ArgumentParser(description="Load local Parquet files into BigQuery")
 parser.add_argument("--source", required=True, help="Local directory containing Parquet files")
 parser.add_argument("--project", required=True, help="GCP project ID")
@@ -11,43 +19,63 @@ parser.add_argument("--dataset", required=True, help="BigQuery dataset name")
 parser.add_argument("--table", required=True, help="BigQuery table name")
 parser.add_argument("--write-mode", default="append", choices=["append", "overwrite"], help="Write mode")
 parser.add_argument("--partition-col", default=None, help="Partition column (optional)")
-parser.add_argument("--batch-size", type=int, default=500, help="Number of files per batch")
+parser.add_argument("--batch-size", type=positive_int, default=500, help="Number of files per batch")
+parser.add_argument("--workers", type=positive_int, default=8, help="Load jobs run concurrently per batch")
 args = parser.parse_args()
 
 # ---- BIGQUERY LOAD FUNCTION ----
-def load_parquet_to_bq(file_paths, project_id, dataset_id, table_id, location="EU"):
-    client = bigquery.Client(project=project_id)
-    job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.PARQUET,
-        autodetect=True,
-        write_disposition=(bigquery.WriteDisposition.WRITE_APPEND if args.write_mode == "append" else bigquery.WriteDisposition.WRITE_TRUNCATE)
-    )
+def load_parquet_to_bq(client, file_paths, dataset_id, table_id, write_disposition, workers=8, location="EU"):
+    def job_config(disposition):
+        return bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            autodetect=True,
+            write_disposition=disposition,
+        )
 
     table_ref = f"{dataset_id}.{table_id}"
-    print(f"[BQ] Loading batch with {len(file_paths)} files into {project_id}.{table_ref} ...")
+    print(f"[BQ] Loading batch with {len(file_paths)} files into {client.project}.{table_ref} ...")
 
-    for file_path in file_paths:
+    def load_one(file_path, config):
         with open(file_path, "rb") as f:
-            job = client.load_table_from_file(f, table_ref, job_config=job_config, location=location)
-            job.result()  # Wait for each file to finish
-            print(f"Loaded {file_path} into {table_ref}")
+            job = client.load_table_from_file(f, table_ref, job_config=config, location=location)
+            job.result()  # Wait for this file to finish
+        return file_path
+
+    # Truncating is only meaningful once: load the first file alone with it,
+    # then append the rest, otherwise each file would replace the previous one.
+    if write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE and file_paths:
+        print(f"Loaded {load_one(file_paths[0], job_config(write_disposition))} into {table_ref}")
+        file_paths = file_paths[1:]
+
+    # Each load job mostly waits on BigQuery, so run several at once; progress
+    # is printed here as jobs finish so lines from different threads never mix.
+    append = job_config(bigquery.WriteDisposition.WRITE_APPEND)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for future in as_completed([ex.submit(load_one, p, append) for p in file_paths]):
+            print(f"Loaded {future.result()} into {table_ref}")  # Re-raises the first failure
 
     print("[BQ] Batch load complete.")
 
 # ---- MAIN ----
+def iter_parquets(root):
+    for p in pathlib.Path(root).rglob("*.parquet"):
+        if p.is_file():
+            yield str(p)
+
 def main():
-    all_files = []
-    for root, _, files in os.walk(args.source):
-        for file in files:
-            if file.endswith(".parquet"):
-                all_files.append(os.path.join(root, file))
-
-    print(f"Found {len(all_files)} parquet files in {args.source}")
-
-    # Batch loading
-    for i in range(0, len(all_files), args.batch_size):
-        batch = all_files[i:i + args.batch_size]
-        load_parquet_to_bq(batch, args.project, args.dataset, args.table)
+    client = bigquery.Client(project=args.project)
+    write_disposition = (bigquery.WriteDisposition.WRITE_APPEND if args.write_mode == "append" else bigquery.WriteDisposition.WRITE_TRUNCATE)
+
+    # Batch loading; the directory walk is consumed one batch at a time, so
+    # the first load starts before the whole tree has been enumerated
+    files = iter_parquets(args.source)
+    total = 0
+    while batch := list(itertools.islice(files, args.batch_size)):
+        load_parquet_to_bq(client, batch, args.dataset, args.table, write_disposition, workers=args.workers)
+        write_disposition = bigquery.WriteDisposition.WRITE_APPEND  # only the first batch may truncate
+        total += len(batch)
+
+    print(f"Loaded {total} parquet files from {args.source}")
 
 if __name__ == "__main__":
     main()